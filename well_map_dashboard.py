@@ -1,38 +1,132 @@
-# Install dash and plotly: pip install dash plotly
+# Install dependencies: pip install -r requirements.txt
 import dash
 from dash import dcc, html, Input, Output, State, dash_table
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
 import numpy as np
+import json
+import math
+import os
+from numba import njit
+from scipy.spatial import cKDTree
+import pyarrow as pa
+from pyarrow import csv as pacsv
+import pyarrow.parquet as pq
 
-# Haversine distance function (miles)
-def haversine(lat1, lon1, lat2, lon2):
+# Haversine distance kernel (miles), all angles in radians
+# Writes the distance from (lat0, lon0) to every well into out
+@njit(fastmath=True, cache=True)
+def haversine_kernel(lat0, lon0, lats, lons, out):
     R = 3958.8  # Earth radius in miles
-    phi1, phi2 = np.radians(lat1), np.radians(lat2)
-    dphi = np.radians(lat2 - lat1)
-    dlambda = np.radians(lon2 - lon1)
-    a = np.sin(dphi/2)**2 + np.cos(phi1)*np.cos(phi2)*np.sin(dlambda/2)**2
-    return 2*R*np.arcsin(np.sqrt(a))
+    cos_lat0 = math.cos(lat0)
+    for i in range(lats.shape[0]):
+        dphi = lats[i] - lat0
+        dlambda = lons[i] - lon0
+        a = math.sin(dphi*0.5)**2 + cos_lat0*math.cos(lats[i])*math.sin(dlambda*0.5)**2
+        out[i] = 2*R*math.asin(math.sqrt(a))
 
-# 1. Read data
-prod_df = pd.read_csv('data/Wells_Production_for modeling-882ff_2025-06-16.csv', parse_dates=['ProducingMonth'])
-header_df = pd.read_csv('data/Header_Wells_info_by each API-14cc3_2025-06-16.csv')
+# Equirectangular distance kernel (miles), all angles in radians, float32 throughout
+# No per-well trig; differs from haversine by under 0.03% at 10 miles and about 0.1% at 50 miles
+@njit(fastmath=True, cache=True)
+def equirect_kernel(lat0, lon0, lats, lons, out):
+    R = np.float32(3958.8)  # Earth radius in miles
+    kx = R * np.float32(math.cos(lat0))
+    for i in range(lats.shape[0]):
+        dx = (lons[i] - lon0) * kx
+        dy = (lats[i] - lat0) * R
+        out[i] = math.sqrt(dx*dx + dy*dy)
 
-# 2. Column names
+EQUIRECT_MAX_RADIUS = 50  # miles; larger radii use haversine
+
+# Read the requested CSV columns through a Parquet copy next to it, re-parsing when the CSV is newer or the
+# requested columns/types changed. The copy is written to a temporary file and renamed into place.
+def read_cached(csv_path, columns=None, column_types=None):
+    parquet_path = os.path.splitext(csv_path)[0] + '.parquet'
+    column_types = column_types or {}
+    cache_key = json.dumps({'columns': columns, 'column_types': {c: str(t) for c, t in column_types.items()}}, sort_keys=True).encode()
+    fresh = (
+        os.path.exists(parquet_path)
+        and os.path.getmtime(parquet_path) >= os.path.getmtime(csv_path)
+        and (pq.read_schema(parquet_path).metadata or {}).get(b'read_cached') == cache_key
+    )
+    if not fresh:
+        try:
+            table = pacsv.read_csv(csv_path, convert_options=pacsv.ConvertOptions(column_types=column_types, include_columns=columns or []))
+        except pa.ArrowInvalid:
+            # pyarrow only parses ISO-8601 timestamps; read pinned timestamp columns as text
+            # and let pandas parse other date formats such as 6/1/2025
+            date_cols = [c for c, t in column_types.items() if pa.types.is_timestamp(t)]
+            text_types = {**column_types, **{c: pa.string() for c in date_cols}}
+            table = pacsv.read_csv(csv_path, convert_options=pacsv.ConvertOptions(column_types=text_types, include_columns=columns or []))
+            for c in date_cols:
+                parsed = pa.array(pd.to_datetime(table[c].to_pandas())).cast(column_types[c])
+                table = table.set_column(table.schema.get_field_index(c), c, parsed)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), b'read_cached': cache_key})
+        tmp_path = f'{parquet_path}.{os.getpid()}.tmp'
+        try:
+            pq.write_table(table, tmp_path, row_group_size=100_000)
+            os.replace(tmp_path, parquet_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    return pd.read_parquet(parquet_path, engine='pyarrow', columns=columns)
+
+# 1. Column names
 well_id_col = 'API_UWI'
 lat_col = 'Latitude'
 lon_col = 'Longitude'
 prod_col = 'Prod_BOE'
 date_col = 'ProducingMonth'
+header_cols = [well_id_col, lat_col, lon_col, 'ENVOperator', 'ENVWellType', 'WellName', 'County']
+
+# 2. Read data
+prod_df = read_cached('data/Wells_Production_for modeling-882ff_2025-06-16.csv', columns=[well_id_col, date_col, prod_col], column_types={date_col: pa.timestamp('s'), prod_col: pa.float32()})
+header_df = read_cached('data/Header_Wells_info_by each API-14cc3_2025-06-16.csv', columns=header_cols)
+
+# Downcast BOE and store repeated strings as categoricals; coordinates stay float64 for display.
+# Production well IDs share the header's categories so the merge compares codes;
+# wells without an ID and production for wells missing from the header are dropped first.
+header_df = header_df[header_df[well_id_col].notna()].copy()
+for c in [well_id_col, 'ENVOperator', 'ENVWellType', 'County', 'WellName']:
+    header_df[c] = header_df[c].astype('category')
+prod_df = prod_df[prod_df[well_id_col].isin(header_df[well_id_col].cat.categories)].copy()
+prod_df[well_id_col] = pd.Categorical(prod_df[well_id_col], categories=header_df[well_id_col].cat.categories)
+prod_df[prod_col] = prod_df[prod_col].astype(np.float32)
 
 # 3. Merge data
-header_cols = [well_id_col, lat_col, lon_col, 'ENVOperator', 'ENVWellType', 'WellName', 'County']
 df = pd.merge(prod_df, header_df[header_cols], on=well_id_col, how='inner')
 wells_map = header_df[header_cols].drop_duplicates(subset=well_id_col).reset_index(drop=True)
 
+# Well coordinates in radians as contiguous float32 arrays for distance calculations
+LATS_RAD = np.radians(wells_map[lat_col].to_numpy(np.float32))
+LONS_RAD = np.radians(wells_map[lon_col].to_numpy(np.float32))
+
+# Row position in wells_map for each well ID
+well_row = pd.Series(np.arange(len(wells_map)), index=wells_map[well_id_col])
+
+# Spatial index on equirectangular-projected well coordinates (miles)
+mean_lat = wells_map[lat_col].mean()
+WELLS_XY = np.column_stack([wells_map[lon_col] * np.cos(np.radians(mean_lat)), wells_map[lat_col]]) * 69.0
+# Wells with a blank Latitude/Longitude are left out of the tree; TREE_ROWS maps
+# tree positions back to wells_map rows
+TREE_ROWS = np.flatnonzero(np.isfinite(WELLS_XY).all(axis=1))
+TREE = cKDTree(WELLS_XY[TREE_ROWS])
+# The projection stretches east-west distances for wells poleward of mean_lat,
+# so pad the query radius to keep every true in-radius well as a candidate
+TREE_PAD = 1.01 * np.cos(np.radians(mean_lat)) / np.cos(np.radians(wells_map[lat_col].abs().max()))
+
 # 4. Get current month for BOE calculation
 latest_month = df[date_col].max()
 current_month_df = df[df[date_col] == latest_month]
+current_boe_by_well = current_month_df.groupby(well_id_col, observed=True)[prod_col].sum()
+# Same totals aligned to wells_map rows, so in-radius row positions index it directly
+current_boe_by_row = current_boe_by_well.reindex(wells_map[well_id_col], fill_value=0).to_numpy()
+
+# Per-well production history, sorted by month. Each well's rows are contiguous,
+# so they are sliced on demand via start offsets indexed by well ID category code
+df_sorted = df.sort_values([well_id_col, date_col])
+prod_offsets = np.searchsorted(df_sorted[well_id_col].cat.codes.to_numpy(), np.arange(len(header_df[well_id_col].cat.categories) + 1))
 
 # 5. Dash App
 app = dash.Dash(__name__)
@@ -63,6 +157,62 @@ DESC_STYLE = {
     'marginBottom': '1.5em',
 }
 
+# 7. Base map figure, sent once; colors and circle overlay are updated clientside
+hovertemplate = (
+    '<b>Well Name:</b> %{customdata[0]}<br>'
+    '<b>Operator:</b> %{customdata[1]}<br>'
+    '<b>API:</b> %{customdata[2]}<br>'
+    '<b>Type:</b> %{customdata[3]}<br>'
+    '<b>County:</b> %{customdata[4]}<br>'
+    '<b>Lat:</b> %{lat:.5f}<br>'
+    '<b>Lon:</b> %{lon:.5f}<extra></extra>'
+)
+map_fig = go.Figure(go.Scattermapbox(
+    lat=wells_map[lat_col],
+    lon=wells_map[lon_col],
+    mode='markers',
+    customdata=wells_map[['WellName', 'ENVOperator', 'API_UWI', 'ENVWellType', 'County']],
+    marker=dict(size=8, color='#a0522d', opacity=0.85),  # default brown
+    hovertemplate=hovertemplate
+))
+map_fig.update_layout(
+    mapbox=dict(style="open-street-map", zoom=8, center=dict(lat=wells_map[lat_col].mean(), lon=wells_map[lon_col].mean())),
+    height=500,
+    showlegend=False,
+    margin=dict(l=0, r=0, t=0, b=0),
+    uirevision='constant',  # keep pan/zoom across selection updates
+)
+# Empty circle overlay trace, filled in on selection
+CIRCLE_ANGLES = np.linspace(0, 2*np.pi, 100)
+CIRCLE_COS, CIRCLE_SIN = np.cos(CIRCLE_ANGLES), np.sin(CIRCLE_ANGLES)
+map_fig.add_trace(go.Scattermapbox(lat=[], lon=[], mode='lines', line=dict(width=2, color='#636efa')))
+
+# 8. Base production history figure; x/y and title are filled in clientside on selection
+prod_fig = px.line(
+    df_sorted.iloc[:0],
+    x=date_col,
+    y=prod_col,
+    markers=True,
+    line_shape='spline'
+)
+prod_fig.update_traces(
+    line=dict(color='#1976d2', width=3),
+    marker=dict(size=6, color='#1976d2'),
+    fill='tozeroy',
+    fillcolor='rgba(33, 150, 243, 0.18)'
+)
+prod_fig.update_layout(
+    xaxis_title='Month',
+    yaxis_title='BOE',
+    font=dict(family='Roboto, Open Sans, Arial, sans-serif', size=15),
+    plot_bgcolor='#f8f9fa',
+    paper_bgcolor='white',
+    margin=dict(l=30, r=30, t=50, b=30),
+    title=dict(font=dict(size=20, color='#1565c0', family='Roboto, Open Sans, Arial, sans-serif')),
+    hovermode='x unified',
+    xaxis_type='date',  # x arrives as epoch milliseconds
+)
+
 app.layout = html.Div([
     html.Div([
         html.H1("Well Production Overview", style=TITLE_STYLE),
@@ -91,6 +241,8 @@ app.layout = html.Div([
                     {'name': 'Lat', 'id': 'Latitude'},
                     {'name': 'Lon', 'id': 'Longitude'}
                 ],
+                page_action='custom',
+                page_current=0,
                 page_size=8,
                 style_table={'overflowX': 'auto', 'background': 'white'},
                 style_cell={
@@ -121,22 +273,24 @@ app.layout = html.Div([
             )
         ], style={**CARD_STYLE, 'width': '35%', 'display': 'inline-block', 'verticalAlign': 'top', 'height': '600px', 'overflowY': 'auto'}),
         html.Div([
-            dcc.Graph(id='well-map', config={'scrollZoom': True})
+            dcc.Graph(id='well-map', figure=map_fig, config={'scrollZoom': True}),
+            dcc.Store(id='map-selection')
         ], style={**CARD_STYLE, 'width': '64%', 'display': 'inline-block', 'verticalAlign': 'top', 'padding': '0', 'height': '600px'}),
     ], style={'width': '100%', 'display': 'flex', 'flexDirection': 'row', 'gap': '2%' }),
     html.Div([
         html.Div([
             html.H4("Production History (BOE)", style={'fontWeight': 'bold', 'color': '#1565c0'}),
-            dcc.Graph(id='prod-history')
+            dcc.Graph(id='prod-history', figure=prod_fig),
+            dcc.Store(id='prod-data')
         ], style={**CARD_STYLE, 'width': '100%', 'display': 'inline-block', 'verticalAlign': 'top', 'marginBottom': 0}),
     ], style={'width': '100%', 'padding': '10px', 'background': 'transparent'}),
 ], style=BG_STYLE)
 
 @app.callback(
-    Output('well-map', 'figure'),
+    Output('map-selection', 'data'),
     Output('selected-well-info', 'children'),
-    Output('wells-table', 'data'),
-    Output('prod-history', 'figure'),
+    Output('wells-table', 'page_current'),
+    Output('prod-data', 'data'),
     Input('well-map', 'clickData'),
     Input('radius-dropdown', 'value')
 )
@@ -149,64 +303,34 @@ def update_dashboard(clickData, radius):
         # Only handle clicks on well points (not the circle)
         if 'customdata' in point and point['customdata'] is not None:
             api_val = point['customdata'][2]  # 'API_UWI' is the third in custom_data
-            center = wells_map[wells_map[well_id_col] == api_val].iloc[0]
+            center = wells_map.iloc[well_row[api_val]]
         else:
             # Fallback: do not change center well if click is not on a well point
             center = wells_map.iloc[0]
-    # Calculate distances
-    dists = haversine(center[lat_col], center[lon_col], wells_map[lat_col], wells_map[lon_col])
-    wells_map['distance'] = dists
-    filtered = wells_map[dists <= radius]
-    filtered_ids = filtered[well_id_col].tolist()
-    # Map coloring and hover tooltip
-    color_arr = np.full(len(wells_map), '#a0522d')  # default brown
-    if len(filtered_ids) > 0:
-        # Set in-radius wells to medium blue
-        in_radius_mask = wells_map[well_id_col].isin(filtered_ids)
-        color_arr[in_radius_mask] = '#64b5f6'
-    # Set selected well to dark blue
-    selected_mask = wells_map[well_id_col] == center[well_id_col]
-    color_arr[selected_mask] = '#1976d2'
-    hovertemplate = (
-        '<b>Well Name:</b> %{customdata[0]}<br>'
-        '<b>Operator:</b> %{customdata[1]}<br>'
-        '<b>API:</b> %{customdata[2]}<br>'
-        '<b>Type:</b> %{customdata[3]}<br>'
-        '<b>County:</b> %{customdata[4]}<br>'
-        '<b>Lat:</b> %{lat:.5f}<br>'
-        '<b>Lon:</b> %{lon:.5f}<extra></extra>'
-    )
-    fig = px.scatter_mapbox(
-        wells_map,
-        lat=lat_col,
-        lon=lon_col,
-        custom_data=['WellName', 'ENVOperator', 'API_UWI', 'ENVWellType', 'County'],
-        zoom=8,
-        height=500
-    )
-    fig.update_traces(
-        marker=dict(size=8, color=color_arr, opacity=0.85),
-        hovertemplate=hovertemplate
-    )
-    fig.update_layout(mapbox_style="open-street-map", showlegend=False, margin=dict(l=0, r=0, t=0, b=0))
-    # Draw circle overlay
-    circle_lats = []
-    circle_lons = []
-    for angle in np.linspace(0, 2*np.pi, 100):
-        dlat = (radius / 69.0) * np.cos(angle)
-        dlon = (radius / (69.0 * np.cos(np.radians(center[lat_col])))) * np.sin(angle)
-        circle_lats.append(center[lat_col] + dlat)
-        circle_lons.append(center[lon_col] + dlon)
-    fig.add_trace(
-        px.line_mapbox(
-            pd.DataFrame({lat_col: circle_lats, lon_col: circle_lons}),
-            lat=lat_col, lon=lon_col
-        ).data[0]
-    )
+    # Candidate wells from the spatial index, refined with exact distances
+    if np.isfinite(WELLS_XY[center.name]).all():
+        idx = TREE_ROWS[np.asarray(TREE.query_ball_point(WELLS_XY[center.name], r=radius * TREE_PAD, return_sorted=True), dtype=np.intp)]
+    else:
+        idx = np.empty(0, np.intp)  # selected well has no coordinates
+    dists = np.empty(len(idx), np.float32)  # local, so concurrent callbacks never share it
+    dist_kernel = equirect_kernel if radius <= EQUIRECT_MAX_RADIUS else haversine_kernel
+    dist_kernel(np.float32(math.radians(center[lat_col])), np.float32(math.radians(center[lon_col])), LATS_RAD[idx], LONS_RAD[idx], dists)
+    in_radius = idx[dists <= radius]
+    # Map selection: recolored and overlaid in the browser by the clientside callback
+    ky = radius / 69.0
+    kx = radius / (69.0 * math.cos(math.radians(center[lat_col])))
+    circle_lats = center[lat_col] + ky * CIRCLE_COS
+    circle_lons = center[lon_col] + kx * CIRCLE_SIN
+    selection = {
+        'total_wells': len(wells_map),
+        'center': int(center.name),
+        'in_radius': in_radius.tolist(),
+        'circle_lat': circle_lats.tolist(),
+        'circle_lon': circle_lons.tolist(),
+    }
     # Calculate metrics for filtered wells
-    num_wells = len(filtered)
-    filtered_current = current_month_df[current_month_df[well_id_col].isin(filtered_ids)]
-    total_boe = filtered_current[prod_col].sum()
+    num_wells = len(in_radius)
+    total_boe = current_boe_by_row[in_radius].sum()
     # Selected well info
     info = html.Div([
         html.P(f"Well ID: {center[well_id_col]}", style={'margin': '0'}),
@@ -227,35 +351,76 @@ def update_dashboard(clickData, radius):
             ], style={'display': 'inline-block', 'padding': '8px 18px', 'background': '#f5faff', 'borderRadius': '8px', 'boxShadow': '0 1px 4px rgba(33,150,243,0.07)'})
         ], style={'margin': '12px 0 8px 0'})
     ])
-    # Table data
-    table_data = filtered[header_cols].to_dict('records')
     # Production history for selected well
-    well_prod = df[df[well_id_col] == center[well_id_col]].sort_values(date_col)
-    fig_prod = px.line(
-        well_prod,
-        x=date_col,
-        y=prod_col,
-        title=f'Production History for {center["WellName"]}',
-        markers=True,
-        line_shape='spline'
-    )
-    fig_prod.update_traces(
-        line=dict(color='#1976d2', width=3),
-        marker=dict(size=6, color='#1976d2'),
-        fill='tozeroy',
-        fillcolor='rgba(33, 150, 243, 0.18)'
-    )
-    fig_prod.update_layout(
-        xaxis_title='Month',
-        yaxis_title='BOE',
-        font=dict(family='Roboto, Open Sans, Arial, sans-serif', size=15),
-        plot_bgcolor='#f8f9fa',
-        paper_bgcolor='white',
-        margin=dict(l=30, r=30, t=50, b=30),
-        title=dict(font=dict(size=20, color='#1565c0', family='Roboto, Open Sans, Arial, sans-serif')),
-        hovermode='x unified',
-    )
-    return fig, info, table_data, fig_prod
+    code = wells_map[well_id_col].cat.codes.iat[center.name]
+    well_prod = df_sorted.iloc[prod_offsets[code]:prod_offsets[code + 1]]
+    prod_data = {
+        'x': well_prod[date_col].dt.as_unit('ms').astype('int64').tolist(),
+        'y': well_prod[prod_col].tolist(),
+        'title': f'Production History for {center["WellName"]}',
+    }
+    # Table restarts at the first page for a new selection
+    return selection, info, 0, prod_data
+
+# Table data: serialize only the visible page of in-radius wells
+@app.callback(
+    Output('wells-table', 'data'),
+    Output('wells-table', 'page_count'),
+    Input('map-selection', 'data'),
+    Input('wells-table', 'page_current'),
+    Input('wells-table', 'page_size')
+)
+def update_table(selection, page_current, page_size):
+    if selection is None:
+        return dash.no_update, dash.no_update
+    rows = selection['in_radius']
+    start = page_current * page_size
+    table_data = wells_map.iloc[rows[start:start + page_size]][header_cols].to_dict('records')
+    return table_data, max(1, math.ceil(len(rows) / page_size))
+
+# Recolor wells (brown: other, medium blue: in radius, dark blue: selected) and draw the radius circle
+app.clientside_callback(
+    """
+    function(selection, fig) {
+        if (!selection || !fig) {
+            return window.dash_clientside.no_update;
+        }
+        const color = new Array(selection.total_wells).fill('#a0522d');
+        selection.in_radius.forEach(function(i) { color[i] = '#64b5f6'; });
+        color[selection.center] = '#1976d2';
+        const wells = Object.assign({}, fig.data[0], {
+            marker: Object.assign({}, fig.data[0].marker, {color: color})
+        });
+        const circle = Object.assign({}, fig.data[1], {
+            lat: selection.circle_lat,
+            lon: selection.circle_lon
+        });
+        return Object.assign({}, fig, {data: [wells, circle]});
+    }
+    """,
+    Output('well-map', 'figure'),
+    Input('map-selection', 'data'),
+    State('well-map', 'figure')
+)
+
+# Production history for the selected well, drawn from the raw month/BOE arrays
+app.clientside_callback(
+    """
+    function(prod, fig) {
+        if (!prod || !fig) {
+            return window.dash_clientside.no_update;
+        }
+        const line = Object.assign({}, fig.data[0], {x: prod.x, y: prod.y});
+        const layout = Object.assign({}, fig.layout, {
+            title: Object.assign({}, fig.layout.title, {text: prod.title})
+        });
+        return Object.assign({}, fig, {data: [line], layout: layout});
+    }
+    """,
+    Output('prod-history', 'figure'),
+    Input('prod-data', 'data'),
+    State('prod-history', 'figure')
+)
 
 if __name__ == '__main__':
     app.run(debug=True) 
\ No newline at end of file